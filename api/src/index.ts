@@ -737,6 +737,69 @@ app.delete('/cart/item/:id', async (req, res) => {
   }
 });
 
+function carIdsOf(body: any): number[] {
+  const raw = Array.isArray(body?.carIds) ? body.carIds : [];
+  const ids = raw.map((v: any) => Number(v)).filter((n: number) => Number.isInteger(n) && n > 0);
+  return Array.from(new Set<number>(ids));
+}
+
+app.post('/cart/add-many', async (req, res) => {
+  const ident = identityOf(req, res);
+  if (!ident) return;
+  try {
+    const carIds = carIdsOf(req.body);
+    if (!carIds.length) return res.status(400).json({ error: 'carIds required' });
+
+    const cart = await getOrCreateCart(ident);
+    const cars = await prisma.car.findMany({
+      where: { carId: { in: carIds } },
+      select: { carId: true, price: true },
+    });
+    const found = new Set(cars.map(c => c.carId));
+
+    await prisma.$transaction(
+      cars.map(c => prisma.cartItem.upsert({
+        where: { cartId_carId: { cartId: cart.cartId, carId: c.carId } },
+        update: { quantity: { increment: 1 }, price: c.price },
+        create: { cartId: cart.cartId, carId: c.carId, quantity: 1, price: c.price },
+      }))
+    );
+
+    const results = carIds.map(carId => found.has(carId)
+      ? { carId, ok: true }
+      : { carId, ok: false, error: 'Car not found' });
+    const data = await getCart(ident);
+    res.json({ ...data, results });
+  } catch (e: any) {
+    res.status(400).json({ error: e.message });
+  }
+});
+
+app.post('/cart/remove-many', async (req, res) => {
+  const ident = identityOf(req, res);
+  if (!ident) return;
+  try {
+    const carIds = carIdsOf(req.body);
+    if (!carIds.length) return res.status(400).json({ error: 'carIds required' });
+
+    const cart = await getOrCreateCart(ident);
+    const items = await prisma.cartItem.findMany({
+      where: { cartId: cart.cartId, carId: { in: carIds } },
+      select: { carId: true },
+    });
+    const present = new Set(items.map(it => it.carId));
+    await prisma.cartItem.deleteMany({ where: { cartId: cart.cartId, carId: { in: [...present] } } });
+
+    const results = carIds.map(carId => present.has(carId)
+      ? { carId, ok: true }
+      : { carId, ok: false, error: 'Item not in your cart' });
+    const data = await getCart(ident);
+    res.json({ ...data, results });
+  } catch (e: any) {
+    res.status(400).json({ error: e.message });
+  }
+});
+
 app.post('/cart/clear', async (req, res) => {
   const ident = identityOf(req, res);
   if (!ident) return;
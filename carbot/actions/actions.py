@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-import os, re, json, requests
-from typing import Any, Text, Dict, List, Optional
+import os, re, json, time, logging, threading, requests
+from collections import OrderedDict
+from typing import Any, Text, Dict, List, Optional, Tuple
 
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
@@ -14,6 +15,14 @@ try:
 except Exception:
     pass
 
+logger = logging.getLogger(__name__)
+
+try:
+    from .ranking import CarRanker
+except ImportError as e:
+    logger.warning("Free-text car ranking disabled: %s", e)
+    CarRanker = None
+
 API_BASE = (os.getenv("CAR_API_BASE", "http://localhost:3000") or "").rstrip("/")
 try:
     _req_ms = float(os.getenv("REQUEST_TIMEOUT_MS", "10000"))
@@ -21,6 +30,22 @@ except Exception:
     _req_ms = 10000.0
 TIMEOUT_S: float = max(_req_ms / 1000.0, 1.0)
 VERIFY_SSL = os.getenv("VERIFY_SSL", "true").lower() == "true"
+try:
+    CART_CACHE_TTL_S = max(float(os.getenv("CART_CACHE_TTL_S", "300")), 0.0)
+except Exception:
+    CART_CACHE_TTL_S = 300.0
+try:
+    CATALOG_TTL_S = max(float(os.getenv("CATALOG_TTL_S", "600")), 0.0)
+except Exception:
+    CATALOG_TTL_S = 600.0
+try:
+    CATALOG_RETRY_S = max(float(os.getenv("CATALOG_RETRY_S", "30")), 0.0)
+except Exception:
+    CATALOG_RETRY_S = 30.0
+try:
+    CART_CACHE_MAX = max(int(os.getenv("CART_CACHE_MAX", "512")), 1)
+except Exception:
+    CART_CACHE_MAX = 512
 
 _CURRENCY_RE = re.compile(r"[^\d.,]")
 
@@ -92,15 +117,19 @@ def _api_post(path: str, payload: Dict[str, Any] | None = None, headers: Dict[st
     except Exception:
         return None
 
-def _api_delete(path: str, params: Dict[str, Any] | None = None, headers: Dict[str, str] | None = None) -> bool:
+def _api_delete(path: str, params: Dict[str, Any] | None = None, headers: Dict[str, str] | None = None) -> Tuple[Optional[int], Optional[Any]]:
+    """Return (HTTP status or None if unreachable, response body or None on failure)."""
     if not API_BASE:
-        return False
+        return None, None
     try:
         r = requests.delete(f"{API_BASE}{path}", params=params or {}, headers=headers or {}, timeout=TIMEOUT_S, verify=VERIFY_SSL)
+    except Exception:
+        return None, None
+    try:
         r.raise_for_status()
-        return True
+        return r.status_code, (r.json() if r.content else {})
     except Exception:
-        return False
+        return r.status_code, None
 
 def _api_get_auth(path: str, jwt_token: str) -> Optional[Any]:
     if not API_BASE or not jwt_token:
@@ -152,6 +181,124 @@ def _save_json(path: str, data: Any):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+# Per-session cart snapshots, keyed by the identity the API uses for the cart
+# (JWT user if present, otherwise x-session-id). Refreshed from the bodies of
+# /cart/add, /cart/item/:id and /cart/clear, dropped when the frontend reports
+# a `cart_updated` event, and bounded by CART_CACHE_TTL_S / CART_CACHE_MAX.
+_CART_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+def _cart_key(headers: Dict[str, str]) -> Optional[str]:
+    return _norm(headers.get("Authorization")) or _norm(headers.get("x-session-id"))
+
+def _cart_store(headers: Dict[str, str], data: Any) -> None:
+    key = _cart_key(headers)
+    if not key:
+        return
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        _CART_CACHE.pop(key, None)
+        return
+    _CART_CACHE[key] = (time.monotonic(), data)
+    _CART_CACHE.move_to_end(key)
+    while len(_CART_CACHE) > CART_CACHE_MAX:
+        _CART_CACHE.popitem(last=False)
+
+def _cart_invalidate(headers: Dict[str, str]) -> None:
+    key = _cart_key(headers)
+    if key:
+        _CART_CACHE.pop(key, None)
+
+def _cart_items(tracker: Tracker, headers: Dict[str, str], fresh: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """Cart items from the snapshot or GET /cart; None if the API could not be reached."""
+    md = tracker.latest_message.get("metadata", {}) or {}
+    if fresh or _norm(md.get("event")) == "cart_updated":
+        _cart_invalidate(headers)
+    key = _cart_key(headers)
+    hit = _CART_CACHE.get(key) if key else None
+    if hit and time.monotonic() - hit[0] <= CART_CACHE_TTL_S:
+        _CART_CACHE.move_to_end(key)
+        return hit[1].get("items", [])
+    data = _api_get("/cart", headers=headers)
+    _cart_store(headers, data)
+    return data.get("items", []) if isinstance(data, dict) else None
+
+def _cart_item_id(items: List[Dict[str, Any]], car_id: int) -> Optional[int]:
+    for it in items:
+        car = (it or {}).get("car", {}) or {}
+        if int(car.get("carId") or it.get("carId") or 0) == int(car_id):
+            return _to_int(it.get("cartItemId"))
+    return None
+
+def _car_ids_from(tracker: Tracker) -> List[int]:
+    # Only NLU-tagged car_id entities are batched; untagged text may contain
+    # counts or model digits ("add 2 cars", "3 series"), so it yields one id.
+    ids: List[int] = []
+    for v in tracker.get_latest_entity_values("car_id"):
+        n = _to_int(v)
+        if n and n not in ids:
+            ids.append(n)
+    if not ids:
+        m = re.search(r"\b\d{1,7}\b", tracker.latest_message.get("text") or "")
+        n = _to_int(m.group(0)) if m else None
+        if n:
+            ids.append(n)
+    if not ids:
+        slot_id = _to_int(tracker.get_slot("car_id"))
+        if slot_id:
+            ids.append(slot_id)
+    return ids
+
+def _batch_summary(verb: str, results: List[Dict[str, Any]], count: int) -> str:
+    if not results:
+        return f"✅ {verb}: {count} items."
+    done = [f"#{r.get('carId')}" for r in results if r.get("ok")]
+    failed = [f"#{r.get('carId')} ({r.get('error') or 'failed'})" for r in results if not r.get("ok")]
+    lines = []
+    if done:
+        lines.append(f"✅ {verb}: {', '.join(done)}")
+    if failed:
+        lines.append(f"⚠️ Skipped: {', '.join(failed)}")
+    return "\n".join(lines)
+
+# (expires_at, ranker). The catalog is loaded and the ranker built on a
+# background thread, then swapped in with a single assignment, so fallback
+# turns never wait on GET /cars. A failed load keeps the previous ranker (or
+# None) and is retried after CATALOG_RETRY_S.
+_RANKER: Tuple[float, Any] = (0.0, None)
+_RANKER_LOCK = threading.Lock()
+_RANKER_BUILDING = False
+
+def _build_ranker() -> None:
+    global _RANKER, _RANKER_BUILDING
+    try:
+        cars = _api_get("/cars") if API_BASE else None
+        if not isinstance(cars, list):
+            cars = _load_json("cars.json", [])
+        if cars:
+            ranker = CarRanker(cars)
+            _RANKER = (time.monotonic() + CATALOG_TTL_S, ranker)
+        else:
+            _RANKER = (time.monotonic() + CATALOG_RETRY_S, _RANKER[1])
+    except Exception:
+        logger.exception("Building the catalog ranker failed")
+        _RANKER = (time.monotonic() + CATALOG_RETRY_S, _RANKER[1])
+    finally:
+        with _RANKER_LOCK:
+            _RANKER_BUILDING = False
+
+def _catalog_ranker() -> Optional[Any]:
+    global _RANKER_BUILDING
+    if CarRanker is None:
+        return None
+    expires_at, ranker = _RANKER
+    if time.monotonic() > expires_at:
+        with _RANKER_LOCK:
+            if not _RANKER_BUILDING:
+                _RANKER_BUILDING = True
+                threading.Thread(target=_build_ranker, name="catalog-ranker", daemon=True).start()
+    return ranker
+
+_catalog_ranker()
+
 def _car_card_html(car: Dict[str, Any]) -> str:
     car_id = car.get("carId") or car.get("id") or "?"
     img = car.get("image") or "assets/images/placeholder-car.png"
@@ -407,7 +554,9 @@ class ActionReserveCar(Action):
             dispatcher.utter_message(text='Please specify the car ID (e.g., "reserve car 176").')
             return []
 
-        added = _api_post("/cart/add", {"carId": int(car_id), "quantity": 1}, headers=_headers_from_tracker(tracker))
+        headers = _headers_from_tracker(tracker)
+        added = _api_post("/cart/add", {"carId": int(car_id), "quantity": 1}, headers=headers)
+        _cart_store(headers, added)
         if added is None:
             dispatcher.utter_message(text="I couldn't add that car to your cart.")
             return []
@@ -425,18 +574,25 @@ class ActionAddToCart(Action):
         return "action_add_to_cart"
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict):
-        car_id = _to_int(tracker.get_slot("car_id"))
-        if not car_id:
-            text = tracker.latest_message.get("text") or ""
-            m = re.search(r"\d{1,7}", text)
-            if m:
-                car_id = _to_int(m.group(0))
-
-        if not car_id:
+        car_ids = _car_ids_from(tracker)
+        if not car_ids:
             dispatcher.utter_message(text='Tell me which car ID to add (e.g., "add 71 to my cart").')
             return []
 
-        resp = _api_post("/cart/add", {"carId": int(car_id), "quantity": 1}, headers=_headers_from_tracker(tracker))
+        headers = _headers_from_tracker(tracker)
+        if len(car_ids) > 1:
+            resp = _api_post("/cart/add-many", {"carIds": car_ids}, headers=headers)
+            _cart_store(headers, resp)
+            if resp is None:
+                dispatcher.utter_message(text="I couldn't add those to your cart.")
+                return []
+            dispatcher.utter_message(text=_batch_summary("Added to your cart", resp.get("results") or [], len(car_ids)))
+            dispatcher.utter_message(json_message={"event": "cart_updated"})
+            return []
+
+        car_id = car_ids[0]
+        resp = _api_post("/cart/add", {"carId": int(car_id), "quantity": 1}, headers=headers)
+        _cart_store(headers, resp)
         if resp is None:
             dispatcher.utter_message(text="I couldn't add that to your cart.")
             return []
@@ -449,8 +605,7 @@ class ActionShowCart(Action):
         return "action_show_cart"
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict):
-        data = _api_get("/cart", headers=_headers_from_tracker(tracker)) or {}
-        items = data.get("items", []) if isinstance(data, dict) else []
+        items = _cart_items(tracker, _headers_from_tracker(tracker))
         if not items:
             dispatcher.utter_message(text="Your cart is empty.")
             return []
@@ -470,7 +625,9 @@ class ActionClearCart(Action):
         return "action_clear_cart"
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict):
-        resp = _api_post("/cart/clear", {}, headers=_headers_from_tracker(tracker))
+        headers = _headers_from_tracker(tracker)
+        resp = _api_post("/cart/clear", {}, headers=headers)
+        _cart_store(headers, resp)
         if resp is None:
             dispatcher.utter_message(text="Hmm, I couldn't clear your cart.")
             return []
@@ -484,32 +641,42 @@ class ActionRemoveFromCart(Action):
         return "action_remove_from_cart"
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict):
-        car_id = _to_int(tracker.get_slot("car_id"))
-        if not car_id:
-            text = tracker.latest_message.get("text") or ""
-            m = re.search(r"\d{1,7}", text)
-            if m:
-                car_id = _to_int(m.group(0))
-
-        if not car_id:
+        car_ids = _car_ids_from(tracker)
+        if not car_ids:
             dispatcher.utter_message(text='Tell me which car ID to remove (e.g., "remove 71 from my cart").')
             return []
 
-        data = _api_get("/cart", headers=_headers_from_tracker(tracker)) or {}
-        items = data.get("items", []) if isinstance(data, dict) else []
-        cart_item_id = None
-        for it in items:
-            car = (it or {}).get("car", {}) or {}
-            if int(car.get("carId") or 0) == int(car_id):
-                cart_item_id = it.get("cartItemId")
-                break
-
-        if not cart_item_id:
-            dispatcher.utter_message(text="That car is not in your cart.")
+        headers = _headers_from_tracker(tracker)
+        if len(car_ids) > 1:
+            resp = _api_post("/cart/remove-many", {"carIds": car_ids}, headers=headers)
+            _cart_store(headers, resp)
+            if resp is None:
+                dispatcher.utter_message(text="I couldn't remove those items.")
+                return []
+            dispatcher.utter_message(text=_batch_summary("Removed from your cart", resp.get("results") or [], len(car_ids)))
+            dispatcher.utter_message(json_message={"event": "cart_updated"})
             return []
 
-        ok = _api_delete(f"/cart/item/{int(cart_item_id)}", headers=_headers_from_tracker(tracker))
-        if not ok:
+        car_id = car_ids[0]
+        items = _cart_items(tracker, headers)
+        if items is None:
+            dispatcher.utter_message(text="I couldn't remove that item.")
+            return []
+        cart_item_id = _cart_item_id(items, car_id)
+        status, resp = _api_delete(f"/cart/item/{cart_item_id}", headers=headers) if cart_item_id else (404, None)
+        if status == 404:
+            # The snapshot may be stale (cart edited elsewhere); retry once against the server.
+            items = _cart_items(tracker, headers, fresh=True)
+            if items is None:
+                dispatcher.utter_message(text="I couldn't remove that item.")
+                return []
+            cart_item_id = _cart_item_id(items, car_id)
+            if not cart_item_id:
+                dispatcher.utter_message(text="That car is not in your cart.")
+                return []
+            status, resp = _api_delete(f"/cart/item/{cart_item_id}", headers=headers)
+        _cart_store(headers, resp)
+        if resp is None:
             dispatcher.utter_message(text="I couldn't remove that item.")
             return []
         dispatcher.utter_message(text=f"🗑️ Removed #{car_id} from your cart.")
@@ -527,8 +694,8 @@ class ActionCheckoutCart(Action):
             dispatcher.utter_message(text="Please log in on the site first, then try checkout again.")
             return []
 
-        cart = _api_get("/cart", headers=_headers_from_tracker(tracker)) or {}
-        items = cart.get("items", []) if isinstance(cart, dict) else []
+        headers = _headers_from_tracker(tracker)
+        items = _cart_items(tracker, headers, fresh=True)
         if not items:
             dispatcher.utter_message(text="Your cart is empty.")
             return []
@@ -566,7 +733,7 @@ class ActionCheckoutCart(Action):
             dispatcher.utter_message(text="Sorry, I couldn't place the order right now.")
             return []
 
-        _ = _api_post("/cart/clear", {}, headers=_headers_from_tracker(tracker))
+        _cart_store(headers, _api_post("/cart/clear", {}, headers=headers))
 
         oid = created.get("orderId")
         dispatcher.utter_message(text=f"✅ Order placed! Your order number is #{oid}.")
@@ -593,7 +760,7 @@ class ActionCancelReservation(Action):
         order_id = _to_int(tracker.get_slot("order_id"))
 
         if order_id and API_BASE:
-            if _api_delete(f"/orders/{order_id}", params={"user": user_email}):
+            if _api_delete(f"/orders/{order_id}", params={"user": user_email})[1] is not None:
                 dispatcher.utter_message(text=f"❌ Order #{order_id} has been canceled.")
                 dispatcher.utter_message(json_message={"event": "order_canceled", "orderId": order_id})
                 return []
@@ -697,6 +864,13 @@ class ActionDefaultFallback(Action):
                 events.append(SlotSet("min_year", min_year))
             dispatcher.utter_message(text="Searching cars matching your filters...")
             return events + [FollowupAction("action_search_car")]
+        ranker = _catalog_ranker()
+        cars = ranker.search(text, k=3) if ranker else []
+        if cars:
+            dispatcher.utter_message(text="Here are some cars that fit what you described:")
+            for car in cars:
+                dispatcher.utter_message(text=_car_card_html(car), html=True)
+            return []
         dispatcher.utter_message(text="Sorry, I didn’t understand. Can you rephrase? 🙂")
         return []
 
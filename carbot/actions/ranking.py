@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import math, re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_FUEL_ALIASES = {"gasoline": "petrol", "ev": "electric"}
+
+# Vague words mapped onto catalog terms (body/fuel) and numeric preferences.
+# Numeric preferences are (price, year, mileage) directions: -1 = lower is better.
+_CONCEPT_TERMS: Dict[str, Tuple[str, ...]] = {
+    "family": ("suv", "wagon", "minivan", "van", "crossover"),
+    "spacious": ("suv", "wagon", "minivan", "van"),
+    "roomy": ("suv", "wagon", "minivan", "van"),
+    "big": ("suv", "van", "minivan", "pickup"),
+    "kids": ("suv", "wagon", "minivan"),
+    "estate": ("wagon",),
+    "mpv": ("minivan",),
+    "sporty": ("coupe", "convertible"),
+    "sport": ("coupe", "convertible"),
+    "fast": ("coupe", "convertible"),
+    "city": ("hatchback",),
+    "small": ("hatchback",),
+    "compact": ("hatchback",),
+    "offroad": ("suv", "pickup"),
+    "4x4": ("suv", "pickup"),
+    "eco": ("electric", "hybrid"),
+    "green": ("electric", "hybrid"),
+    "efficient": ("hybrid", "diesel"),
+    "economical": ("hybrid", "diesel"),
+    "gasoline": ("petrol",),
+    "ev": ("electric",),
+}
+_CONCEPT_NUMERIC: Dict[str, Tuple[float, float, float]] = {
+    "cheap": (-1.0, 0.0, 0.0),
+    "budget": (-1.0, 0.0, 0.0),
+    "affordable": (-1.0, 0.0, 0.0),
+    "inexpensive": (-1.0, 0.0, 0.0),
+    "economical": (-0.5, 0.0, 0.0),
+    "luxury": (1.0, 0.5, 0.0),
+    "premium": (1.0, 0.5, 0.0),
+    "expensive": (1.0, 0.0, 0.0),
+    "new": (0.0, 1.0, -0.5),
+    "newer": (0.0, 1.0, -0.5),
+    "recent": (0.0, 1.0, 0.0),
+    "modern": (0.0, 1.0, 0.0),
+    "reliable": (0.0, 0.5, -0.5),
+    "old": (0.0, -1.0, 0.0),
+    "classic": (0.0, -1.0, 0.0),
+    "vintage": (0.0, -1.0, 0.0),
+}
+_PHRASE_NUMERIC: List[Tuple[re.Pattern, Tuple[float, float, float]]] = [
+    (re.compile(r"\b(?:low|few|little)\s+(?:mileage|miles|km|kilometers|kilometres)\b"), (0.0, 0.0, -1.0)),
+    (re.compile(r"\bhigh\s+(?:mileage|miles|km|kilometers|kilometres)\b"), (0.0, 0.0, 1.0)),
+    (re.compile(r"\blow\s+price\b"), (-1.0, 0.0, 0.0)),
+]
+
+# Words that say the user is talking about a car without naming one, so
+# "cheap car" can be ranked on numeric preferences alone.
+_CAR_NOUNS = {"car", "cars", "vehicle", "vehicles", "auto", "autos", "ride"}
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "be", "i", "im", "me", "my",
+    "you", "your", "we", "our", "it", "its", "this", "that", "these", "those",
+    "to", "of", "for", "in", "on", "at", "by", "with", "and", "or", "not",
+    "what", "whats", "how", "why", "when", "where", "who", "do", "does", "can",
+    "could", "would", "will", "here", "there", "please", "some", "any", "from",
+    "about", "like", "have", "has", "want", "need", "get", "show", "find",
+}
+
+TEXT_WEIGHT = 1.0
+NUMERIC_WEIGHT = 0.5
+# Cars matching the same query terms tie on text; break ties towards cheaper,
+# newer, lower-mileage cars. Small enough (|score| <= 0.01) never to outrank
+# a car that matches more of the query.
+TIEBREAK_WEIGHT = 0.02
+MAX_GROUPS = 32
+_TIEBREAK_PREFS = np.array([-1.0, 1.0, -1.0], dtype=np.float32) / 3.0
+
+
+def _tokens(s: Any) -> List[str]:
+    """Lowercase word tokens, minus one-character, digit-only and stop words."""
+    return [
+        t for t in _TOKEN_RE.findall(str(s or "").lower())
+        if len(t) >= 2 and not t.isdigit() and t not in _STOPWORDS
+    ]
+
+
+def _car_terms(car: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Return (anchor terms, all terms); anchors are make/model/body/fuel, not color."""
+    anchors: List[str] = []
+    anchors += _tokens(car.get("make"))
+    anchors += _tokens(car.get("model"))
+    anchors += _tokens(car.get("bodyType") or car.get("body"))
+    anchors += [_FUEL_ALIASES.get(t, t) for t in _tokens(car.get("fuel"))]
+    terms = anchors + _tokens(car.get("color"))
+    return anchors, list(dict.fromkeys(terms))
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        f = float(v)
+        return f if math.isfinite(f) else None
+    except Exception:
+        return None
+
+
+class CarRanker:
+    """Ranks a car catalog against free-text requests.
+
+    Each car is a padded row of vocabulary ids for its make/model/body/fuel/color
+    terms plus normalized price, year and mileage. A query is a set of term
+    groups (a word and the catalog terms it stands for, e.g. "family" -> SUV,
+    wagon, ...), each weighted by idf. The text score is the idf-weighted
+    fraction of groups a car matches, in [0, 1]; numeric preferences are added
+    on top. Every car is scored in one pass and the top-k are picked with
+    ``argpartition``.
+    """
+
+    def __init__(self, cars: List[Dict[str, Any]]):
+        self.cars = [c for c in cars if isinstance(c, dict)]
+        parsed = [_car_terms(c) for c in self.cars]
+        docs = [terms for _, terms in parsed]
+        self.anchors = {t for anchors, _ in parsed for t in anchors}
+
+        vocab: Dict[str, int] = {}
+        for terms in docs:
+            for t in terms:
+                vocab.setdefault(t, len(vocab) + 1)  # id 0 is padding
+        self.vocab = vocab
+
+        width = max((len(d) for d in docs), default=1) or 1
+        ids = np.zeros((len(docs), width), dtype=np.int32)
+        for i, terms in enumerate(docs):
+            ids[i, :len(terms)] = [vocab[t] for t in terms]
+        self.term_ids = ids
+
+        df = np.bincount(ids.ravel(), minlength=len(vocab) + 1).astype(np.float32)
+        idf = np.log((1.0 + len(docs)) / (1.0 + df)) + 1.0
+        idf[0] = 0.0
+        self.idf = idf.astype(np.float32)
+
+        cols = []
+        for key, use_log in (("price", True), ("year", False), ("mileage", True)):
+            col = np.array([_num(c.get(key)) for c in self.cars], dtype=np.float64)
+            if use_log:
+                col = np.log1p(np.clip(col, 0, None))
+            known = col[np.isfinite(col)]
+            lo, hi = (float(known.min()), float(known.max())) if known.size else (0.0, 0.0)
+            span = (hi - lo) if hi > lo else 1.0
+            col = np.nan_to_num((col - lo) / span, nan=0.5) - 0.5
+            cols.append(col)
+        self.numeric = np.stack(cols, axis=1).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.cars)
+
+    def _query(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+        """Return (group bits, group weights, numeric preferences, is-about-cars).
+
+        Group bits map each vocabulary id to a bitmask of the query groups it
+        belongs to, so OR-ing ``bits[term_ids]`` per row gives the groups each
+        car hits. At most MAX_GROUPS groups are kept.
+        """
+        t = (text or "").lower()
+        prefs = np.zeros(3, dtype=np.float32)
+        tokens = _tokens(t)
+        anchored = any(tok in _CAR_NOUNS for tok in tokens)
+
+        for pat, vec in _PHRASE_NUMERIC:
+            if pat.search(t):
+                prefs += vec
+                anchored = True
+
+        groups: Dict[Tuple[int, ...], float] = {}
+        for tok in tokens:
+            if tok in _CONCEPT_NUMERIC:
+                prefs += _CONCEPT_NUMERIC[tok]
+            terms = [tok] if tok in self.vocab else list(_CONCEPT_TERMS.get(tok, ()))
+            if not terms and tok.endswith("s") and tok[:-1] in self.vocab:
+                terms = [tok[:-1]]
+            if tok in self.anchors or (tok.endswith("s") and tok[:-1] in self.anchors):
+                anchored = True
+            vids = tuple(sorted({self.vocab[term] for term in terms if term in self.vocab}))
+            if vids and (vids in groups or len(groups) < MAX_GROUPS):
+                groups[vids] = float(self.idf[list(vids)].max())
+
+        bits = np.zeros(len(self.vocab) + 1, dtype=np.uint32)
+        for g, vids in enumerate(groups):
+            bits[list(vids)] |= np.uint32(1 << g)
+        gw = np.array(list(groups.values()), dtype=np.float32)
+        if gw.size:
+            gw /= gw.sum()
+        pn = float(np.abs(prefs).sum())
+        if pn > 0:
+            prefs /= pn
+        return bits, gw, prefs, anchored
+
+    def search(self, text: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Return up to ``k`` cars best matching ``text``, or [] if it is not a car request.
+
+        A request must name a make/model/body/fuel, mention a car, or describe
+        mileage; vague words alone ("new", "old", "city") are not enough.
+        """
+        if not self.cars or k <= 0:
+            return []
+        bits, gw, prefs, anchored = self._query(text)
+        if not anchored or (not gw.size and not prefs.any()):
+            return []
+
+        tiebreak = np.where(prefs == 0, _TIEBREAK_PREFS, 0.0).astype(np.float32)
+        scores = self.numeric @ (TIEBREAK_WEIGHT * tiebreak + NUMERIC_WEIGHT * prefs)
+        if gw.size:
+            hit = np.bitwise_or.reduce(bits[self.term_ids], axis=1)
+            for g, w in enumerate(gw):
+                scores += (TEXT_WEIGHT * w) * ((hit >> g) & 1)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.cars[i] for i in top]
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("rasa_sdk")
+from rasa_sdk import Tracker  # noqa: E402
+from rasa_sdk.executor import CollectingDispatcher  # noqa: E402
+
+from actions import actions  # noqa: E402
+
+
+def _tracker(text, car_ids=(), slots=None):
+    entities = [{"entity": "car_id", "value": str(v)} for v in car_ids]
+    return Tracker(
+        "test", dict(slots or {}),
+        {"text": text, "entities": entities, "metadata": {"session_id": "s1"}},
+        [], False, None, {}, "action_listen",
+    )
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    calls = []
+
+    def fake_post(path, payload=None, headers=None):
+        calls.append((path, payload))
+        return {"items": [], "results": [{"carId": c, "ok": True} for c in (payload or {}).get("carIds", [])]}
+
+    monkeypatch.setattr(actions, "_api_post", fake_post)
+    actions._CART_CACHE.clear()
+    return calls
+
+
+def test_tagged_entities_are_batched(posts):
+    actions.ActionAddToCart().run(CollectingDispatcher(), _tracker("add 71, 72 and 90 to my cart", [71, 72, 90]), {})
+    assert posts == [("/cart/add-many", {"carIds": [71, 72, 90]})]
+
+
+def test_tagged_entities_ignore_counts_and_model_digits(posts):
+    actions.ActionAddToCart().run(CollectingDispatcher(), _tracker("add 3 cars: 71, 72 and the A4", [71, 72]), {})
+    assert posts == [("/cart/add-many", {"carIds": [71, 72]})]
+
+
+@pytest.mark.parametrize("text", ["add 2 cars: 71 and 72", "add the 3 series 330"])
+def test_untagged_numbers_are_never_batched(posts, text):
+    actions.ActionAddToCart().run(CollectingDispatcher(), _tracker(text), {})
+    assert len(posts) == 1
+    assert posts[0][0] == "/cart/add"
+
+
+def test_slot_is_used_when_text_has_no_id(posts):
+    actions.ActionAddToCart().run(CollectingDispatcher(), _tracker("add it to my cart", slots={"car_id": 71}), {})
+    assert posts == [("/cart/add", {"carId": 71, "quantity": 1})]
+
+
+def test_batch_reply_without_results_is_not_empty(monkeypatch):
+    monkeypatch.setattr(actions, "_api_post", lambda *a, **k: {"items": []})
+    dispatcher = CollectingDispatcher()
+    actions.ActionRemoveFromCart().run(dispatcher, _tracker("remove 71 and 72", [71, 72]), {})
+    texts = [m.get("text") for m in dispatcher.messages if m.get("text")]
+    assert texts == ["✅ Removed from your cart: 2 items."]
@@ -0,0 +1,98 @@
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "carbot"))
+
+pytest.importorskip("numpy")
+from actions.ranking import CarRanker  # noqa: E402
+
+
+MODELS = {
+    "Mercedes-Benz": ["S", "C"],
+    "Mazda": ["2", "CX-5"],
+    "Fiat": ["500", "Panda"],
+    "Toyota": ["Corolla", "RAV4", "Sienna"],
+    "BMW": ["X5", "M4"],
+    "Ferrari": ["Purosangue"],
+}
+FAMILY_BODIES = {"SUV", "Wagon", "Minivan", "Van", "Crossover"}
+
+
+def _prisma_enum(name):
+    schema = (ROOT / "api" / "prisma" / "schema.prisma").read_text(encoding="utf-8")
+    body = re.search(rf"enum\s+{name}\s*{{([^}}]*)}}", schema).group(1)
+    return re.findall(r"^\s*(\w+)\s*$", body, re.MULTILINE)
+
+
+BODIES = _prisma_enum("BodyType")
+FUELS = _prisma_enum("FuelType")
+
+
+@pytest.fixture(scope="module")
+def ranker():
+    rnd = random.Random(0)
+    cars = []
+    for i in range(2000):
+        make = rnd.choice(list(MODELS))
+        cars.append({
+            "carId": i,
+            "make": make,
+            "model": rnd.choice(MODELS[make]),
+            "bodyType": rnd.choice(BODIES),
+            "fuel": rnd.choice(FUELS),
+            "color": rnd.choice(["red", "black", "white"]),
+            "year": rnd.randint(1995, 2024),
+            "price": rnd.randint(270000, 290000) if make == "Ferrari" else rnd.randint(2000, 90000),
+            "mileage": rnd.randint(0, 300000),
+        })
+    return CarRanker(cars)
+
+
+@pytest.mark.parametrize("text", [
+    "what's the weather",
+    "what is 2 plus 2",
+    "how old are you",
+    "I'm new here",
+    "do you deliver to the city?",
+    "hello there",
+])
+def test_off_topic_text_returns_nothing(ranker, text):
+    assert ranker.search(text) == []
+
+
+def test_fixture_uses_full_schema_enums():
+    assert {"Van", "Crossover", "Convertible", "Pickup", "Other"} <= set(BODIES)
+
+
+@pytest.mark.parametrize("text", [
+    "cheap reliable family car with low mileage",
+    "cheap family car",
+    "family car with low mileage",
+])
+def test_vague_family_request_ranks_family_bodies(ranker, text):
+    cars = ranker.search(text, k=3)
+    assert len(cars) == 3
+    assert all(c["bodyType"] in FAMILY_BODIES for c in cars)
+
+
+@pytest.mark.parametrize("text", ["electric suv", "wagon"])
+def test_equal_text_matches_prefer_cheaper_cars_over_rare_makes(ranker, text):
+    cars = ranker.search(text, k=3)
+    assert len(cars) == 3
+    assert all(c["make"] != "Ferrari" for c in cars)
+
+
+def test_numeric_preferences_decide_between_equal_text_matches(ranker):
+    cars = ranker.search("reliable wagon", k=3)
+    assert len(cars) == 3
+    assert all(c["bodyType"] == "Wagon" and c["year"] >= 2020 for c in cars)
+
+
+def test_make_request_ranks_that_make(ranker):
+    cars = ranker.search("sporty red bmw", k=3)
+    assert cars and all(c["make"] == "BMW" for c in cars)
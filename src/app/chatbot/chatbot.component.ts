@@ -70,7 +70,15 @@ export class ChatbotComponent implements OnInit, AfterViewChecked, OnDestroy {
   @ViewChild('chatBody', { static: false }) chatBody!: ElementRef<HTMLDivElement>;
   @ViewChild('chatWindow', { static: false }) chatWindow!: ElementRef<HTMLDivElement>;
 
-  private cartChangedListener = () => this.cartService.refresh().subscribe();
+  private cartDirty = false;
+
+  private cartChangedListener = (e: Event) => {
+    if ((e as CustomEvent).detail?.source !== 'chatbot') {
+      this.cartDirty = true;
+      return;
+    }
+    this.cartService.refresh().subscribe();
+  };
 
   constructor(
     private http: HttpClient,
@@ -189,6 +197,10 @@ export class ChatbotComponent implements OnInit, AfterViewChecked, OnDestroy {
       sid: this.cartSessionId
     };
     if (jwt) metadata.jwt = jwt;
+    if (this.cartDirty) {
+      metadata.event = 'cart_updated';
+      this.cartDirty = false;
+    }
 
     this.http
       .post<RasaMessage[]>(this.endpoint, {
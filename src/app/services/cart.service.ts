@@ -51,6 +51,7 @@ export class CartService {
     this.http.post<ServerCart>(`${this.api}/cart/add`, { carId: car.id, quantity: 1 }, { headers: this.headers() })
       .pipe(
         tap(sc => this.cartSubject.next(this.mapServerToClient(sc))),
+        tap(() => this.notifyChanged()),
         catchError(_ => {
           const curr = this.cartSubject.value.slice();
           if (!curr.some(i => i.id === car.id)) {
@@ -68,6 +69,7 @@ export class CartService {
       this.http.delete<ServerCart>(`${this.api}/cart/item/${item.serverItemId}`, { headers: this.headers() })
         .pipe(
           tap(sc => this.cartSubject.next(this.mapServerToClient(sc))),
+          tap(() => this.notifyChanged()),
           catchError(_ => {
             this.removeLocal(carId);
             return of(this.cartSubject.value);
@@ -96,6 +98,7 @@ export class CartService {
     this.http.post<ServerCart>(`${this.api}/cart/clear`, {}, { headers: this.headers() })
       .pipe(
         tap(sc => this.cartSubject.next(this.mapServerToClient(sc))),
+        tap(() => this.notifyChanged()),
         catchError(_ => {
           this.cartSubject.next([]);
           return of([]);
@@ -119,6 +122,10 @@ export class CartService {
       );
   }
 
+  private notifyChanged() {
+    window.dispatchEvent(new CustomEvent('carstore:cartChanged', { detail: { source: 'cart' } }));
+  }
+
   private headers(): HttpHeaders {
     return new HttpHeaders().set('x-session-id', this.ensureSessionId());
   }